@@ -4,20 +4,30 @@ import os
 import subprocess
 import re
 import json
+import urllib.parse
+import urllib.request
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFileDialog, QTextEdit, QProgressBar,
     QGroupBox, QMessageBox, QFrame, QDialog, QCheckBox, QRadioButton,
-    QButtonGroup
+    QButtonGroup, QSpinBox, QInputDialog
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 
+# Shared modules live next to the scripts in a checkout, or in /usr/share/grsms
+sys.path.append("/usr/share/grsms")
+from grsms_download import RangedDownloader, is_url, local_name
+from grsms_backends import BACKENDS, which
+from grsms_widgets import PerformanceTabs
+
 # Config
 CONFIG_PATH = os.path.expanduser("~/.config/grpi/settings.json")
 DEFAULT_SETTINGS = {
     "auto_close": False,
     "preferred_pm": "auto",
+    "download_connections": 4,
+    "profiles": {},
 }
 
 def load_settings():
@@ -34,8 +44,32 @@ def save_settings(settings):
     with open(CONFIG_PATH, "w") as f:
         json.dump(settings, f, indent=2)
 
-def which(cmd):
-    return subprocess.run(["which", cmd], capture_output=True).returncode == 0
+
+class DownloadThread(QThread):
+    output_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal("qint64", "qint64")
+    header_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(int, str)
+
+    def __init__(self, url, settings):
+        super().__init__()
+        self.downloader = RangedDownloader(
+            url, settings.get("download_connections", 4),
+            log=self.output_signal.emit,
+            progress=self.progress_signal.emit,
+            header_ready=self.header_signal.emit,
+        )
+
+    def stop(self):
+        self.downloader.stop()
+
+    def run(self):
+        try:
+            path = self.downloader.run()
+            self.finished_signal.emit(0, path)
+        except Exception as e:
+            self.output_signal.emit(f"ERROR: {e}")
+            self.finished_signal.emit(1, "")
 
 
 class InstallThread(QThread):
@@ -47,13 +81,13 @@ class InstallThread(QThread):
         self.rpm_path = rpm_path
         self.settings = settings
 
-    def _pick_pm(self):
-        pref = self.settings.get("preferred_pm", "auto")
-        if pref != "auto" and which(pref):
+    def _pick_backend(self):
+        pref = BACKENDS.get(self.settings.get("preferred_pm", "auto"))
+        if pref and pref.available():
             return pref
-        for pm in ["dnf", "zypper", "yum", "rpm"]:
-            if which(pm):
-                return pm
+        for backend in BACKENDS.values():
+            if backend.auto and backend.available():
+                return backend
         return None
 
     def _pick_escalation(self):
@@ -64,7 +98,7 @@ class InstallThread(QThread):
 
     def run(self):
         try:
-            pm = self._pick_pm()
+            backend = self._pick_backend()
             esc = self._pick_escalation()
 
             if not esc:
@@ -72,24 +106,22 @@ class InstallThread(QThread):
                 self.finished_signal.emit(1)
                 return
 
-            if pm == "dnf":
-                install_cmd = ["dnf", "install", "-y", self.rpm_path]
-                self.output_signal.emit("Using dnf (dependency resolution enabled)...")
-            elif pm == "zypper":
-                install_cmd = ["zypper", "--non-interactive", "install", self.rpm_path]
-                self.output_signal.emit("Using zypper (dependency resolution enabled)...")
-            elif pm == "yum":
-                install_cmd = ["yum", "install", "-y", self.rpm_path]
-                self.output_signal.emit("Using yum (dependency resolution enabled)...")
-            elif pm == "rpm":
-                install_cmd = ["rpm", "-ivh", "--replacepkgs", self.rpm_path]
-                self.output_signal.emit("WARNING: Using rpm directly - no automatic dependency resolution.")
-            else:
+            if not backend:
                 self.output_signal.emit("ERROR: No package manager found.")
                 self.finished_signal.emit(1)
                 return
 
-            cmd = (["kdesu", "--"] if esc == "kdesu" else [esc]) + install_cmd
+            profile = self.settings.get("profiles", {}).get(backend.key, {})
+            cmd = backend.command("install", profile, [self.rpm_path])
+            if backend.key == "rpm":
+                self.output_signal.emit("WARNING: Using rpm directly - no automatic dependency resolution.")
+            else:
+                self.output_signal.emit(f"Using {backend.key} (dependency resolution enabled)...")
+            tuning = backend.env(profile) + backend.options(profile)
+            if tuning:
+                self.output_signal.emit("Performance options: " + " ".join(tuning))
+
+            cmd = (["kdesu", "--"] if esc == "kdesu" else [esc]) + cmd
 
             process = subprocess.Popen(cmd, stdout=subprocess.PIPE,
                                        stderr=subprocess.STDOUT, text=True)
@@ -132,13 +164,8 @@ class SettingsDialog(QDialog):
         pm_layout.addWidget(note)
 
         self.pm_button_group = QButtonGroup(self)
-        managers = [
-            ("auto",   "Automatic — use best available (recommended)", True),
-            ("dnf",    "dnf  — Fedora / RHEL / Ultramarine",           which("dnf")),
-            ("zypper", "zypper — openSUSE",                            which("zypper")),
-            ("yum",    "yum  — older RHEL / CentOS",                   which("yum")),
-            ("rpm",    "rpm  — direct install (no dependency resolution)", which("rpm")),
-        ]
+        managers = [("auto", "Automatic — use best available (recommended)", True)]
+        managers += [(b.key, b.label, b.available()) for b in BACKENDS.values()]
 
         pref = self.settings.get("preferred_pm", "auto")
         for key, label, available in managers:
@@ -154,6 +181,26 @@ class SettingsDialog(QDialog):
 
         layout.addWidget(pm_group)
 
+        # Downloads
+        dl_group = QGroupBox("Downloads")
+        dl_layout = QHBoxLayout(dl_group)
+        dl_layout.addWidget(QLabel("Parallel connections when installing from a URL:"))
+        self.connections_spin = QSpinBox()
+        self.connections_spin.setRange(1, 16)
+        self.connections_spin.setValue(self.settings.get("download_connections", 4))
+        dl_layout.addWidget(self.connections_spin)
+        layout.addWidget(dl_group)
+
+        # Performance
+        perf_group = QGroupBox("Performance")
+        perf_layout = QVBoxLayout(perf_group)
+        perf_note = QLabel("Passed as options on each command; system config files are not changed.")
+        perf_note.setStyleSheet("color: gray; font-size: 10px;")
+        perf_layout.addWidget(perf_note)
+        self.perf_tabs = PerformanceTabs(self.settings.get("profiles", {}))
+        perf_layout.addWidget(self.perf_tabs)
+        layout.addWidget(perf_group)
+
         # Buttons
         btn_row = QHBoxLayout()
         btn_row.addStretch()
@@ -169,6 +216,8 @@ class SettingsDialog(QDialog):
 
     def _save(self):
         self.settings["auto_close"] = self.auto_close_cb.isChecked()
+        self.settings["download_connections"] = self.connections_spin.value()
+        self.settings["profiles"] = self.perf_tabs.profiles()
         for btn in self.pm_button_group.buttons():
             if btn.isChecked():
                 self.settings["preferred_pm"] = btn.property("pm_key")
@@ -185,12 +234,17 @@ class GrpiWindow(QMainWindow):
         super().__init__()
         self.rpm_path = None
         self.install_thread = None
+        self.download_thread = None
+        self.stopping_downloads = []   # cancelled, still unwinding
+        self.closing = False
         self.settings = load_settings()
         self.setWindowTitle("grpi - RPM Package Installer")
         self.setMinimumSize(620, 540)
         self.setWindowIcon(QIcon.fromTheme("system-software-install"))
         self._build_ui()
-        if rpm_file and os.path.isfile(rpm_file):
+        if rpm_file and rpm_file.startswith("file://"):
+            rpm_file = urllib.request.url2pathname(urllib.parse.urlparse(rpm_file).path)
+        if rpm_file and (is_url(rpm_file) or os.path.isfile(rpm_file)):
             self._load_rpm(rpm_file)
 
     def _build_ui(self):
@@ -229,6 +283,10 @@ class GrpiWindow(QMainWindow):
         browse_btn.setIcon(QIcon.fromTheme("document-open"))
         browse_btn.clicked.connect(self._browse_file)
         file_row.addWidget(browse_btn)
+        url_btn = QPushButton("Open URL...")
+        url_btn.setIcon(QIcon.fromTheme("download"))
+        url_btn.clicked.connect(self._open_url)
+        file_row.addWidget(url_btn)
         layout.addWidget(file_group)
 
         # Package info
@@ -288,7 +346,44 @@ class GrpiWindow(QMainWindow):
         if path:
             self._load_rpm(path)
 
+    def _open_url(self):
+        url, ok = QInputDialog.getText(self, "Open RPM from URL", "Package URL (http or https):")
+        url = url.strip()
+        if not ok or not url:
+            return
+        if not is_url(url):
+            QMessageBox.warning(self, "Invalid URL", "Please enter an http:// or https:// URL.")
+            return
+        self._load_rpm(url)
+
+    def _stop_download(self):
+        # Cancel without waiting: a read from a stalled mirror only notices
+        # after the socket timeout, so the thread unwinds in the background.
+        # Its queued signals are dropped so they can't touch the UI.
+        thread, self.download_thread = self.download_thread, None
+        if thread and thread.isRunning():
+            for sig in (thread.output_signal, thread.header_signal,
+                        thread.progress_signal, thread.finished_signal):
+                sig.disconnect()
+            self.stopping_downloads.append(thread)
+            thread.finished.connect(lambda t=thread: self._forget_download(t))
+            thread.stop()
+            if thread.isFinished():
+                self._forget_download(thread)
+
+    def _forget_download(self, thread):
+        if thread not in self.stopping_downloads:
+            return
+        thread.wait()   # already finished, returns at once
+        self.stopping_downloads.remove(thread)
+        if self.closing and not self.stopping_downloads:
+            QApplication.quit()
+
     def _load_rpm(self, path):
+        self._stop_download()
+        if is_url(path):
+            self._download_rpm(path)
+            return
         self.rpm_path = path
         self.file_label.setText(os.path.basename(path))
         self.file_label.setStyleSheet("color: black; font-weight: bold;")
@@ -296,6 +391,49 @@ class GrpiWindow(QMainWindow):
         self._query_rpm_info(path)
         self.install_btn.setEnabled(True)
 
+    def _download_rpm(self, url):
+        self.rpm_path = None
+        self.install_btn.setEnabled(False)
+        self.file_label.setText(local_name(url) + "  (downloading...)")
+        self.file_label.setStyleSheet("color: gray; font-weight: bold;")
+        self.info_label.setText("Fetching package header...")
+        self.log_output.clear()
+        self._log(f"Downloading {url}")
+        self.progress.setRange(0, 0)
+        self.progress.setVisible(True)
+
+        self.download_thread = DownloadThread(url, self.settings)
+        self.download_thread.output_signal.connect(self._log)
+        self.download_thread.header_signal.connect(self._query_rpm_info)
+        self.download_thread.progress_signal.connect(self._download_progress)
+        self.download_thread.finished_signal.connect(self._download_finished)
+        self.download_thread.start()
+
+    def _download_progress(self, done, total):
+        if total <= 0:
+            return
+        self.progress.setRange(0, 100)
+        self.progress.setValue(done * 100 // total)
+        self.progress.setFormat(f"%p%  ({done / 1048576:.1f} of {total / 1048576:.1f} MB)")
+
+    def _download_finished(self, exit_code, path):
+        self.progress.setVisible(False)
+        self.progress.setRange(0, 0)
+        self.progress.resetFormat()
+        if exit_code == 0:
+            self._log("✔ Download complete.")
+            self.rpm_path = path
+            self.file_label.setText(os.path.basename(path))
+            self.file_label.setStyleSheet("color: black; font-weight: bold;")
+            self._query_rpm_info(path)
+            self.install_btn.setEnabled(True)
+        else:
+            self._log("✘ Download failed. Open the same URL again to resume.")
+            self.file_label.setStyleSheet("color: red; font-weight: bold;")
+            QMessageBox.critical(self, "Download Failed",
+                                 "The package could not be downloaded.\n"
+                                 "Check the log for details.")
+
     def _query_rpm_info(self, path):
         try:
             result = subprocess.run(["rpm", "-qip", path], capture_output=True, text=True)
@@ -361,6 +499,17 @@ class GrpiWindow(QMainWindow):
                                  f"Installation failed with exit code {exit_code}.\n"
                                  "Check the log for details.")
 
+    def closeEvent(self, event):
+        # Stop an unfinished download; its progress is kept for resuming.
+        # Hide at once, but only quit after cancelled downloads have unwound
+        self._stop_download()
+        if self.stopping_downloads:
+            self.closing = True
+            self.hide()
+            event.ignore()
+        else:
+            event.accept()
+
 
 def main():
     app = QApplication(sys.argv)
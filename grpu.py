@@ -2,28 +2,63 @@
 import sys
 import os
 import subprocess
+import json
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QTextEdit, QProgressBar, QGroupBox,
-    QMessageBox, QFrame, QCheckBox, QFileDialog
+    QMessageBox, QFrame, QCheckBox, QFileDialog, QDialog
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 
+# Shared modules live next to the scripts in a checkout, or in /usr/share/grsms
+sys.path.append("/usr/share/grsms")
+from grsms_backends import BACKENDS, which
+from grsms_widgets import PerformanceTabs
 
-# ── Helpers ────────────────────────────────────────────────────────────────────
-def which(cmd):
-    return subprocess.run(["which", cmd], capture_output=True).returncode == 0
 
+# ── Config ─────────────────────────────────────────────────────────────────────
+CONFIG_PATH = os.path.expanduser("~/.config/grpu/settings.json")
+DEFAULT_SETTINGS = {
+    "profiles": {},
+}
+
+def load_settings():
+    try:
+        with open(CONFIG_PATH) as f:
+            s = DEFAULT_SETTINGS.copy()
+            s.update(json.load(f))
+            return s
+    except Exception:
+        return DEFAULT_SETTINGS.copy()
+
+def save_settings(settings):
+    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
+    with open(CONFIG_PATH, "w") as f:
+        json.dump(settings, f, indent=2)
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
 def find_escalation():
     for tool in ["pkexec", "kdesu", "sudo"]:
         if which(tool):
             return tool
     return None
 
+def update_tasks(backend, profile):
+    """Return [(task name, command)] that bring the system up to date."""
+    tasks = []
+    refresh = backend.refresh_cmd()
+    if refresh:
+        tasks.append((f"{backend.title} — Refresh repos", refresh))
+    action = backend.update_action
+    tasks.append((f"{backend.title} — {action.capitalize()} packages", backend.command(action, profile)))
+    return tasks
+
 AVAILABLE = {
     "dnf":     which("dnf"),
+    "dnf5":    which("dnf5"),
     "zypper":  which("zypper"),
     "yum":     which("yum"),
     "flatpak": which("flatpak"),
@@ -93,6 +128,50 @@ class StatusLabel(QLabel):
             self.setStyleSheet("color: #e74c3c; font-weight: bold;")
 
 
+# ── Settings dialog ────────────────────────────────────────────────────────────
+class SettingsDialog(QDialog):
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings.copy()
+        self.setWindowTitle("GRPU Settings")
+        self.setMinimumWidth(420)
+        self.setWindowIcon(QIcon.fromTheme("configure"))
+        self._build_ui()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        perf_group = QGroupBox("Performance")
+        perf_layout = QVBoxLayout(perf_group)
+        note = QLabel("Passed as options on each command; system config files are not changed.")
+        note.setStyleSheet("color: gray; font-size: 10px;")
+        perf_layout.addWidget(note)
+        self.perf_tabs = PerformanceTabs(self.settings.get("profiles", {}))
+        perf_layout.addWidget(self.perf_tabs)
+        layout.addWidget(perf_group)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        save_btn = QPushButton("Save")
+        save_btn.setIcon(QIcon.fromTheme("document-save"))
+        save_btn.clicked.connect(self._save)
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.setIcon(QIcon.fromTheme("dialog-cancel"))
+        cancel_btn.clicked.connect(self.reject)
+        btn_row.addWidget(save_btn)
+        btn_row.addWidget(cancel_btn)
+        layout.addLayout(btn_row)
+
+    def _save(self):
+        self.settings["profiles"] = self.perf_tabs.profiles()
+        save_settings(self.settings)
+        self.accept()
+
+    def get_settings(self):
+        return self.settings
+
+
 # ── Main window ────────────────────────────────────────────────────────────────
 class GrpuWindow(QMainWindow):
     def __init__(self):
@@ -101,6 +180,7 @@ class GrpuWindow(QMainWindow):
         self.task_queue = []
         self.results   = []
         self.running   = False
+        self.settings  = load_settings()
 
         self.setWindowTitle("GRPU - Graphical RedHat Package Updater")
         self.setMinimumSize(700, 600)
@@ -131,6 +211,10 @@ class GrpuWindow(QMainWindow):
         header.addStretch()
         self.status_lbl = StatusLabel()
         header.addWidget(self.status_lbl)
+        settings_btn = QPushButton("Settings")
+        settings_btn.setIcon(QIcon.fromTheme("configure"))
+        settings_btn.clicked.connect(self._open_settings)
+        header.addWidget(settings_btn)
         layout.addLayout(header)
 
         sep = QFrame(); sep.setFrameShape(QFrame.HLine); sep.setFrameShadow(QFrame.Sunken)
@@ -142,6 +226,7 @@ class GrpuWindow(QMainWindow):
         self.checks = {}
         sources = [
             ("dnf",     "DNF — system packages (Fedora / RHEL / Ultramarine)", AVAILABLE["dnf"]),
+            ("dnf5",    "DNF5 — system packages via the dnf5 command",          AVAILABLE["dnf5"]),
             ("zypper",  "Zypper — system packages (openSUSE)",                  AVAILABLE["zypper"]),
             ("yum",     "YUM — system packages (older RHEL / CentOS)",          AVAILABLE["yum"]),
             ("flatpak", "Flatpak — sandboxed applications",                     AVAILABLE["flatpak"]),
@@ -149,7 +234,8 @@ class GrpuWindow(QMainWindow):
         ]
         for key, label, available in sources:
             cb = QCheckBox(label if available else label + "  [not installed]")
-            cb.setChecked(available)
+            # dnf5 keeps its own history, so only run it when ticked by hand
+            cb.setChecked(available and key != "dnf5")
             cb.setEnabled(available)
             if not available:
                 cb.setToolTip("Not installed on this system")
@@ -203,16 +289,19 @@ class GrpuWindow(QMainWindow):
         btn_row.addWidget(close_btn)
         layout.addLayout(btn_row)
 
+    def _open_settings(self):
+        dlg = SettingsDialog(self.settings, self)
+        if dlg.exec_() == QDialog.Accepted:
+            self.settings = dlg.get_settings()
+
     # ── Build task list ────────────────────────────────────────────────────────
     def _build_task_list(self):
         tasks = []
-        if self.checks["dnf"].isChecked():
-            tasks.append(UpdateThread("DNF — Upgrade packages", ["dnf", "upgrade", "-y"], needs_root=True))
-        if self.checks["zypper"].isChecked():
-            tasks.append(UpdateThread("Zypper — Refresh repos",   ["zypper", "refresh"], needs_root=True))
-            tasks.append(UpdateThread("Zypper — Update packages", ["zypper", "--non-interactive", "update"], needs_root=True))
-        if self.checks["yum"].isChecked():
-            tasks.append(UpdateThread("YUM — Update packages", ["yum", "update", "-y"], needs_root=True))
+        profiles = self.settings.get("profiles", {})
+        for key in ("dnf", "dnf5", "zypper", "yum"):
+            if self.checks[key].isChecked():
+                for name, cmd in update_tasks(BACKENDS[key], profiles.get(key, {})):
+                    tasks.append(UpdateThread(name, cmd, needs_root=True))
         if self.checks["flatpak"].isChecked():
             tasks.append(UpdateThread("Flatpak — Update all", ["flatpak", "update", "-y"], needs_root=False))
         if self.checks["snap"].isChecked():
@@ -13,15 +13,19 @@ Includes GRPI (RPM installer) and GRPU (package updater).
 %install
 mkdir -p %{buildroot}/usr/local/bin
 mkdir -p %{buildroot}/usr/share/applications
+mkdir -p %{buildroot}/usr/share/grsms
 
 install -m 755 %{_sourcedir}/grpi %{buildroot}/usr/local/bin/grpi
 install -m 755 %{_sourcedir}/grpu %{buildroot}/usr/local/bin/grpu
+install -m 644 %{_sourcedir}/grsms_download.py %{buildroot}/usr/share/grsms/grsms_download.py
+install -m 644 %{_sourcedir}/grsms_backends.py %{buildroot}/usr/share/grsms/grsms_backends.py
+install -m 644 %{_sourcedir}/grsms_widgets.py %{buildroot}/usr/share/grsms/grsms_widgets.py
 
 cat > %{buildroot}/usr/share/applications/grpi.desktop << EOF
 [Desktop Entry]
 Name=GRPI RPM Installer
 Comment=Install local RPM packages
-Exec=grpi %f
+Exec=grpi %u
 MimeType=application/x-rpm;
 Icon=system-software-install
 Type=Application
@@ -43,6 +47,9 @@ EOF
 %files
 %attr(0755, root, root) /usr/local/bin/grpi
 %attr(0755, root, root) /usr/local/bin/grpu
+/usr/share/grsms/grsms_download.py
+/usr/share/grsms/grsms_backends.py
+/usr/share/grsms/grsms_widgets.py
 /usr/share/applications/grpi.desktop
 /usr/share/applications/grpu.desktop
 
@@ -0,0 +1,166 @@
+"""Package manager backends and their performance profiles, shared by grpi and grpu."""
+import os
+import shutil
+import subprocess
+
+
+def which(cmd):
+    return subprocess.run(["which", cmd], capture_output=True).returncode == 0
+
+def dnf_is_dnf5():
+    # Fedora 41+ ships dnf as a symlink to dnf5
+    path = shutil.which("dnf")
+    return bool(path) and os.path.basename(os.path.realpath(path)).startswith("dnf5")
+
+
+class Backend:
+    """A package manager command line plus its per-invocation performance options.
+
+    TUNABLES lists (key, label, kind) where kind is "int" or "bool". A profile
+    value of None (or 0 for ints) keeps the system default. Backends with
+    auto = False are only used when picked explicitly. update_action is the
+    command that brings the system up to date, None if there is none.
+    """
+    key = ""
+    binary = ""
+    label = ""
+    title = ""
+    auto = True
+    update_action = "update"
+    TUNABLES = []
+    PRESETS = {}
+
+    def available(self):
+        return which(self.binary)
+
+    def options(self, profile):
+        return []
+
+    def env(self, profile):
+        return []
+
+    def base_cmd(self, action):
+        raise NotImplementedError
+
+    def refresh_cmd(self):
+        """Command to run before updating, or None."""
+        return None
+
+    def command(self, action, profile, targets=()):
+        """Full command line for action, tuned by profile."""
+        cmd = self.base_cmd(action) + self.options(profile) + list(targets)
+        # pkexec and sudo drop the caller's environment, so pass it through env
+        env = self.env(profile)
+        return (["env"] + env if env else []) + cmd
+
+
+class DnfBackend(Backend):
+    key = "dnf"
+    binary = "dnf"
+    label = "dnf  — Fedora / RHEL / Ultramarine"
+    title = "DNF"
+    update_action = "upgrade"
+    TUNABLES = [
+        ("max_parallel_downloads", "Parallel downloads",                "int"),
+        ("deltarpm",               "Use delta RPMs",                    "bool"),
+        ("fastestmirror",          "Pick the fastest mirror",           "bool"),
+        ("keepcache",              "Keep downloaded packages in cache", "bool"),
+    ]
+    PRESETS = {
+        "LAN mirror": {"max_parallel_downloads": 10, "deltarpm": False, "fastestmirror": False},
+        "WAN link":   {"max_parallel_downloads": 5,  "deltarpm": True,  "fastestmirror": True},
+    }
+
+    def is_dnf5(self):
+        return dnf_is_dnf5()
+
+    def options(self, profile):
+        # dnf may be dnf5 behind a symlink, which has no delta RPM support
+        skip = {"deltarpm"} if self.is_dnf5() else set()
+        opts = []
+        for key, _, kind in self.TUNABLES:
+            value = profile.get(key)
+            if value is None or (kind == "int" and value <= 0) or key in skip:
+                continue
+            opts.append(f"--setopt={key}={value}")
+        return opts
+
+    def base_cmd(self, action):
+        return [self.binary, action, "-y"]
+
+
+class Dnf5Backend(DnfBackend):
+    # Runs the dnf5 command even where dnf is still dnf4. dnf5 keeps its own
+    # history and state, so it is never chosen automatically.
+    key = "dnf5"
+    binary = "dnf5"
+    label = "dnf5 — use the dnf5 command (keeps its own history)"
+    title = "DNF5"
+    auto = False
+    TUNABLES = [t for t in DnfBackend.TUNABLES if t[0] != "deltarpm"]
+    PRESETS = {
+        "LAN mirror": {"max_parallel_downloads": 10, "fastestmirror": False},
+        "WAN link":   {"max_parallel_downloads": 5,  "fastestmirror": True},
+    }
+
+    def is_dnf5(self):
+        return True
+
+
+class ZypperBackend(Backend):
+    key = "zypper"
+    binary = "zypper"
+    label = "zypper — openSUSE"
+    title = "Zypper"
+    TUNABLES = [
+        ("download_in_advance", "Download all packages before installing", "bool"),
+        ("parallel_downloads",  "Parallel package downloads (libzypp preload)", "bool"),
+    ]
+    PRESETS = {
+        "LAN mirror": {"download_in_advance": True, "parallel_downloads": True},
+        "WAN link":   {"download_in_advance": True},
+    }
+
+    def options(self, profile):
+        value = profile.get("download_in_advance")
+        if value is None:
+            return []
+        return ["--download-in-advance"] if value else ["--download-as-needed"]
+
+    def env(self, profile):
+        value = profile.get("parallel_downloads")
+        if value is None:
+            return []
+        return ["ZYPP_CURL2=1", "ZYPP_PCK_PRELOAD=1"] if value else ["ZYPP_PCK_PRELOAD=0"]
+
+    def base_cmd(self, action):
+        return ["zypper", "--non-interactive", action]
+
+    def refresh_cmd(self):
+        return ["zypper", "refresh"]
+
+
+class YumBackend(Backend):
+    key = "yum"
+    binary = "yum"
+    label = "yum  — older RHEL / CentOS"
+    title = "YUM"
+
+    def base_cmd(self, action):
+        return ["yum", action, "-y"]
+
+
+class RpmBackend(Backend):
+    # Only installs; no dependency resolution
+    key = "rpm"
+    binary = "rpm"
+    label = "rpm  — direct install (no dependency resolution)"
+    title = "RPM"
+    update_action = None
+
+    def base_cmd(self, action):
+        return ["rpm", "-ivh", "--replacepkgs"]
+
+
+# In automatic selection order
+BACKENDS = {b.key: b for b in (DnfBackend(), Dnf5Backend(), ZypperBackend(), YumBackend(), RpmBackend())}
@@ -0,0 +1,423 @@
+"""Parallel, resumable HTTP downloads of RPM packages for grpi.
+
+Kept free of Qt so it can be used and tested without a display.
+"""
+import os
+import json
+import shutil
+import subprocess
+import hashlib
+import http.client
+import struct
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DOWNLOAD_DIR = os.path.expanduser("~/.cache/grpi/downloads")
+
+def is_url(path):
+    return urllib.parse.urlparse(path).scheme in ("http", "https")
+
+def url_digest(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+def local_name(url):
+    """Safe file name for url: its last path component, ending in .rpm."""
+    name = os.path.basename(urllib.parse.unquote(urllib.parse.urlparse(url).path))
+    if name in ("", ".", "..") or "\0" in name:
+        name = url_digest(url)
+    if not name.endswith(".rpm"):
+        name += ".rpm"
+    return name
+
+
+# RPM file layout: 96 byte lead, signature header (padded to 8 bytes),
+# main header, then the compressed payload. Each header starts with a
+# 16 byte intro: magic(3) version(1) reserved(4) nindex(4) hsize(4).
+RPM_LEAD_SIZE = 96
+RPM_LEAD_MAGIC = b"\xed\xab\xee\xdb"
+RPM_HEADER_MAGIC = b"\x8e\xad\xe8"
+
+def rpm_header_size(data):
+    """Return (needed, complete) for the lead + headers found in data.
+
+    needed is the total number of bytes required to parse further, or the
+    payload offset once complete is True. Raises ValueError on bad magic.
+    """
+    if len(data) < RPM_LEAD_SIZE:
+        return RPM_LEAD_SIZE, False
+    if data[:4] != RPM_LEAD_MAGIC:
+        raise ValueError("not an RPM package (bad lead magic)")
+    offset = RPM_LEAD_SIZE
+    for padded in (True, False):
+        if len(data) < offset + 16:
+            return offset + 16, False
+        if data[offset:offset + 3] != RPM_HEADER_MAGIC:
+            raise ValueError("corrupt RPM header (bad header magic)")
+        nindex, hsize = struct.unpack(">II", data[offset + 8:offset + 16])
+        offset += 16 + nindex * 16 + hsize
+        if padded:
+            offset += (8 - offset % 8) % 8
+    return offset, True
+
+
+# Digest tags: the signature header holds a SHA256 of the main header, and
+# the main header (rpm >= 4.14) a digest of the compressed payload.
+RPMSIGTAG_SHA256 = 273
+RPMTAG_PAYLOADDIGEST = 5092
+RPMTAG_PAYLOADDIGESTALGO = 5093
+DIGEST_ALGOS = {1: "md5", 2: "sha1", 8: "sha256", 9: "sha384", 10: "sha512", 11: "sha224"}
+
+def _header_tags(data, offset):
+    """Return ({tag: first value}, end offset) for the header at offset.
+
+    Only string and int32 tags are decoded; that is all the digests need.
+    """
+    nindex, hsize = struct.unpack(">II", data[offset + 8:offset + 16])
+    store = offset + 16 + nindex * 16
+    tags = {}
+    for i in range(nindex):
+        entry = offset + 16 + i * 16
+        tag, kind, off, _ = struct.unpack(">IIII", data[entry:entry + 16])
+        if kind in (6, 8, 9):     # STRING, STRING_ARRAY, I18NSTRING
+            tags[tag] = data[store + off:data.index(b"\0", store + off)].decode("ascii", "replace")
+        elif kind == 4:           # INT32
+            tags[tag] = struct.unpack(">I", data[store + off:store + off + 4])[0]
+    return tags, store + hsize
+
+def rpm_payload_digest(data):
+    """Check the header SHA256 of the complete lead + headers in data.
+
+    Returns the payload digest as (hashlib name, hex digest), or None when
+    the package carries no header or payload digest. Raises ValueError if
+    the header does not match its digest.
+    """
+    try:
+        sig, sig_end = _header_tags(data, RPM_LEAD_SIZE)
+        start = sig_end + (8 - sig_end % 8) % 8
+        tags, end = _header_tags(data, start)
+    except struct.error:
+        raise ValueError("corrupt RPM header (bad index)")
+    expected = sig.get(RPMSIGTAG_SHA256)
+    if expected is None:
+        return None
+    if hashlib.sha256(data[start:end]).hexdigest() != expected:
+        raise ValueError("RPM header digest mismatch")
+    algo = DIGEST_ALGOS.get(tags.get(RPMTAG_PAYLOADDIGESTALGO))
+    digest = tags.get(RPMTAG_PAYLOADDIGEST)
+    return (algo, digest) if algo and digest else None
+
+
+class PayloadHasher:
+    """Hash the payload in file order while parallel ranges fill it in.
+
+    RPM digests cover the payload front to back, so each chunk is hashed
+    once everything before it has arrived: the first chunk as it streams,
+    later ones as soon as the gap before them closes.
+    """
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, fd, start, algo, expected):
+        self.fd = fd
+        self.pos = start
+        self.expected = expected
+        self.hash = hashlib.new(algo)
+        self._lock = threading.Lock()
+
+    def update(self, data):
+        self.hash.update(data)
+        self.pos += len(data)
+
+    def advance(self, chunks, wait=False):
+        """Hash what is contiguous from pos; chunks are in file order."""
+        # Only one worker hashes at a time, the others keep downloading
+        if not self._lock.acquire(blocking=wait):
+            return
+        try:
+            for chunk in chunks:
+                if chunk["end"] <= self.pos:
+                    continue
+                while self.pos < chunk["pos"]:
+                    data = os.pread(self.fd, min(self.BLOCK_SIZE, chunk["pos"] - self.pos), self.pos)
+                    if not data:
+                        raise IOError(f"short read at byte {self.pos}")
+                    self.update(data)
+                if chunk["pos"] < chunk["end"]:
+                    break
+        finally:
+            self._lock.release()
+
+    def check(self):
+        if self.hash.hexdigest() != self.expected:
+            raise ValueError("payload digest mismatch")
+
+
+class RangedDownloader:
+    """Fetch a URL with parallel HTTP Range requests into download_dir.
+
+    The RPM headers are fetched first so the package can be queried before
+    the payload arrives. Progress is kept in a .part.json file next to the
+    .part file, so an interrupted download resumes where it stopped.
+    """
+    BLOCK_SIZE = 256 * 1024
+    HEADER_PROBE = 64 * 1024
+    MIN_CHUNK = 1024 * 1024
+    RETRIES = 3
+    RETRY_DELAY = 1
+    TIMEOUT = 30
+
+    def __init__(self, url, connections=4, log=None, progress=None, header_ready=None,
+                 download_dir=None):
+        self.url = url
+        self.fetch_url = url     # where the probe was redirected to
+        self.download_dir = download_dir or DOWNLOAD_DIR
+        self.connections = max(1, int(connections))
+        self.log = log or (lambda text: None)
+        self.progress = progress or (lambda done, total: None)
+        self.header_ready = header_ready or (lambda path: None)
+        # One directory per URL so equal file names from different URLs don't clash
+        self.dest = os.path.join(self.download_dir, url_digest(url), local_name(url))
+        self.part_path = self.dest + ".part"
+        self.state_path = self.part_path + ".json"
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        self._stop.set()
+
+    def _open(self, headers=None):
+        req = urllib.request.Request(self.fetch_url, headers={"User-Agent": "grpi", **(headers or {})})
+        return urllib.request.urlopen(req, timeout=self.TIMEOUT)
+
+    def _probe(self):
+        # A one byte range request tells us the size, range support and
+        # validators in one round trip, even on servers that reject HEAD.
+        with self._open({"Range": "bytes=0-0"}) as resp:
+            # Pin the mirror a redirector picked, so every range comes from
+            # the same server and carries the same validator
+            self.fetch_url = resp.geturl()
+            # A weak ETag never matches If-Range (RFC 9110 13.1.5), so a
+            # compliant server would answer every range with the whole file
+            etag = resp.headers.get("ETag", "")
+            if etag.startswith("W/"):
+                etag = ""
+            validator = etag or resp.headers.get("Last-Modified") or ""
+            if resp.status == 206:
+                total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                return (int(total) if total.isdigit() else None), True, validator
+            length = resp.headers.get("Content-Length", "")
+            return (int(length) if length.isdigit() else None), False, validator
+
+    def _load_state(self, size, validator):
+        # Without an ETag or Last-Modified a changed file of the same size
+        # can't be told apart, so never mix its bytes with old ones
+        if not validator:
+            return None
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if ("header_end" in state and state["url"] == self.url and state["size"] == size
+                    and state["validator"] == validator and os.path.isfile(self.part_path)):
+                return state
+        except Exception:
+            pass
+        return None
+
+    def _discard(self):
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _save_state(self, state):
+        with self._lock:
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+
+    def _get_range(self, start, end, validator):
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        if validator:
+            headers["If-Range"] = validator
+        resp = self._open(headers)
+        content_range = resp.headers.get("Content-Range", "")
+        if resp.status != 206 or not content_range.startswith(f"bytes {start}-{end - 1}/"):
+            resp.close()
+            raise IOError(f"server ignored range {start}-{end - 1} (file changed on server?)")
+        return resp
+
+    def _fetch_header(self, fd, size, validator):
+        buf = b""
+        while True:
+            needed, complete = rpm_header_size(buf)
+            if complete and len(buf) >= needed:
+                break
+            if len(buf) >= size:
+                raise ValueError("file ended before the RPM header was complete")
+            end = min(size, max(needed, len(buf) + self.HEADER_PROBE))
+            with self._get_range(len(buf), end, validator) as resp:
+                data = resp.read()
+            if len(data) != end - len(buf):
+                raise IOError("short read while fetching RPM header")
+            buf += data
+        os.pwrite(fd, buf, 0)
+        return len(buf)
+
+    def _fetch_chunk(self, fd, chunk, state, hasher=None):
+        attempt = 0
+        while chunk["pos"] < chunk["end"]:
+            if self._stop.is_set():
+                raise InterruptedError("download cancelled")
+            try:
+                with self._get_range(chunk["pos"], chunk["end"], state["validator"]) as resp:
+                    blocks = 0
+                    while chunk["pos"] < chunk["end"]:
+                        if self._stop.is_set():
+                            raise InterruptedError("download cancelled")
+                        data = resp.read(min(self.BLOCK_SIZE, chunk["end"] - chunk["pos"]))
+                        if not data:
+                            raise IOError(f"connection closed at byte {chunk['pos']}")
+                        os.pwrite(fd, data, chunk["pos"])
+                        with self._lock:
+                            chunk["pos"] += len(data)
+                            state["done"] += len(data)
+                        self.progress(state["done"], state["size"])
+                        if hasher:
+                            hasher.advance(state["chunks"])
+                        blocks += 1
+                        if blocks % 16 == 0:
+                            self._save_state(state)
+                attempt = 0
+            except (IOError, http.client.HTTPException) as e:
+                if isinstance(e, InterruptedError):
+                    raise
+                attempt += 1
+                if attempt > self.RETRIES:
+                    raise
+                self.log(f"Range {chunk['pos']}-{chunk['end'] - 1} failed ({e}), retrying...")
+                self._stop.wait(attempt * self.RETRY_DELAY)
+
+    def _split(self, start, size):
+        count = max(1, min(self.connections, (size - start) // self.MIN_CHUNK))
+        step = -(-(size - start) // count)
+        return [{"pos": s, "end": min(s + step, size)} for s in range(start, size, step)]
+
+    def _fetch_single(self):
+        # Server without range support: stream it once, still previewing
+        # the header as soon as enough bytes have arrived.
+        self.log("Server does not support ranged downloads, using a single connection.")
+        buf, done, hasher, previewed = b"", 0, None, False
+        with self._open() as resp, open(self.part_path, "wb") as f:
+            total = resp.headers.get("Content-Length", "")
+            total = int(total) if total.isdigit() else 0
+            while True:
+                if self._stop.is_set():
+                    raise InterruptedError("download cancelled")
+                data = resp.read(self.BLOCK_SIZE)
+                if not data:
+                    break
+                f.write(data)
+                done += len(data)
+                self.progress(done, total)
+                if previewed:
+                    if hasher:
+                        hasher.update(data)
+                    continue
+                buf += data
+                needed, complete = rpm_header_size(buf)
+                if complete and len(buf) >= needed:
+                    payload = rpm_payload_digest(buf[:needed])
+                    if payload:
+                        hasher = PayloadHasher(None, needed, *payload)
+                        hasher.update(buf[needed:])
+                    f.flush()
+                    self.header_ready(self.part_path)
+                    previewed, buf = True, b""
+        if total and done != total:
+            raise IOError(f"download incomplete ({done} of {total} bytes)")
+        if not previewed:
+            raise ValueError("file ended before the RPM header was complete")
+        return hasher
+
+    def _verify(self):
+        if not shutil.which("rpm"):
+            self.log("rpm not found, skipping digest verification.")
+            return
+        # Polled so that stop() can cut a long check of a large package short
+        proc = subprocess.Popen(["rpm", "-K", "--nosignature", self.part_path],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        while proc.poll() is None:
+            if self._stop.wait(0.1):
+                proc.kill()
+                proc.wait()
+                raise InterruptedError("download cancelled")
+        output = proc.stdout.read().strip()
+        proc.stdout.close()
+        if proc.returncode != 0:
+            raise ValueError(f"digest verification failed: {output}")
+        self.log("Package digests verified.")
+
+    def _fetch_ranged(self, size, validator):
+        state = self._load_state(size, validator)
+        if state:
+            self.log(f"Resuming download ({state['done'] // 1024} of {size // 1024} KB already fetched).")
+        fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            if not state:
+                header_end = self._fetch_header(fd, size, validator)
+                state = {"url": self.url, "size": size, "validator": validator,
+                         "header_end": header_end, "done": header_end,
+                         "chunks": self._split(header_end, size)}
+                self._save_state(state)
+            # The header fetch may have run past the header into the payload
+            head = os.pread(fd, state["header_end"], 0)
+            payload_start = rpm_header_size(head)[0]
+            payload = rpm_payload_digest(head[:payload_start])
+            self.header_ready(self.part_path)
+            self.progress(state["done"], size)
+
+            hasher = PayloadHasher(fd, payload_start, *payload) if payload else None
+            pending = [c for c in state["chunks"] if c["pos"] < c["end"]]
+            self.log(f"Downloading {size // 1024} KB using {len(pending)} connection(s)...")
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+                    futures = [pool.submit(self._fetch_chunk, fd, c, state, hasher) for c in pending]
+                    for future in futures:
+                        try:
+                            future.result()
+                        except BaseException:
+                            self._stop.set()
+                            raise
+            finally:
+                self._save_state(state)
+            if hasher:
+                hasher.advance(state["chunks"], wait=True)
+            return hasher
+        finally:
+            os.close(fd)
+
+    def run(self):
+        """Download the package and return its local path."""
+        os.makedirs(os.path.dirname(self.dest), exist_ok=True)
+        size, ranged, validator = self._probe()
+        try:
+            if not ranged or not size:
+                hasher = self._fetch_single()
+            else:
+                hasher = self._fetch_ranged(size, validator)
+            if hasher:
+                hasher.check()
+                self.log("Header and payload digests verified.")
+            else:
+                # Built without a payload digest (rpm < 4.14): check afterwards
+                self._verify()
+        except ValueError:
+            # A bad file must start over next time rather than resume
+            self._discard()
+            raise
+        os.replace(self.part_path, self.dest)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.dest
@@ -0,0 +1,66 @@
+"""Qt widgets shared by grpi and grpu."""
+from PyQt5.QtWidgets import QWidget, QTabWidget, QFormLayout, QComboBox, QSpinBox
+
+from grsms_backends import BACKENDS
+
+
+class PerformanceTabs(QTabWidget):
+    """One tab of performance options per backend that has any."""
+    BOOL_CHOICES = [("System default", None), ("On", True), ("Off", False)]
+
+    def __init__(self, profiles, parent=None):
+        super().__init__(parent)
+        self.widgets = {}
+        for backend in BACKENDS.values():
+            if backend.TUNABLES:
+                self._add_tab(backend, profiles.get(backend.key, {}))
+
+    def _add_tab(self, backend, profile):
+        page = QWidget()
+        form = QFormLayout(page)
+        preset = QComboBox()
+        preset.addItems(["System defaults"] + list(backend.PRESETS))
+        preset.setCurrentIndex(-1)
+        preset.activated[str].connect(lambda name, b=backend: self._apply(b, b.PRESETS.get(name, {})))
+        form.addRow("Preset:", preset)
+
+        for key, label, kind in backend.TUNABLES:
+            value = profile.get(key)
+            if kind == "int":
+                w = QSpinBox()
+                w.setRange(0, 20)
+                w.setSpecialValueText("System default")
+                w.setValue(value or 0)
+            else:
+                w = QComboBox()
+                w.addItems([text for text, _ in self.BOOL_CHOICES])
+                self._set_bool(w, value)
+            self.widgets[(backend.key, key)] = (kind, w)
+            form.addRow(label + ":", w)
+
+        title = backend.key if backend.available() else backend.key + " [not installed]"
+        self.addTab(page, title)
+
+    def _apply(self, backend, values):
+        for key, _, kind in backend.TUNABLES:
+            _, w = self.widgets[(backend.key, key)]
+            value = values.get(key)
+            if kind == "int":
+                w.setValue(value or 0)
+            else:
+                self._set_bool(w, value)
+
+    def _set_bool(self, combo, value):
+        values = [v for _, v in self.BOOL_CHOICES]
+        combo.setCurrentIndex(values.index(value) if value in values else 0)
+
+    def profiles(self):
+        profiles = {}
+        for (backend_key, key), (kind, w) in self.widgets.items():
+            if kind == "int":
+                value = w.value() or None
+            else:
+                value = self.BOOL_CHOICES[w.currentIndex()][1]
+            if value is not None:
+                profiles.setdefault(backend_key, {})[key] = value
+        return profiles
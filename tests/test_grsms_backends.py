@@ -0,0 +1,85 @@
+import os
+import shutil
+
+import pytest
+
+from grsms_backends import BACKENDS, Dnf5Backend, DnfBackend, ZypperBackend, dnf_is_dnf5
+
+
+@pytest.fixture
+def dnf_links_to(monkeypatch):
+    """Make the dnf on PATH resolve to the given binary name."""
+    def link(target):
+        monkeypatch.setattr(shutil, "which", lambda cmd: "/usr/bin/dnf" if cmd == "dnf" else None)
+        monkeypatch.setattr(os.path, "realpath", lambda path: f"/usr/bin/{target}")
+    return link
+
+
+def test_system_defaults_add_no_options(dnf_links_to):
+    dnf_links_to("dnf-3")
+    assert BACKENDS["dnf"].command("install", {}, ["/x.rpm"]) == ["dnf", "install", "-y", "/x.rpm"]
+    assert BACKENDS["dnf5"].command("upgrade", {}) == ["dnf5", "upgrade", "-y"]
+    assert BACKENDS["zypper"].command("update", {}) == ["zypper", "--non-interactive", "update"]
+    assert BACKENDS["yum"].command("update", {}) == ["yum", "update", "-y"]
+    assert BACKENDS["rpm"].command("install", {}, ["/x.rpm"]) == ["rpm", "-ivh", "--replacepkgs", "/x.rpm"]
+    none = {"max_parallel_downloads": None, "deltarpm": None, "download_in_advance": None}
+    assert BACKENDS["dnf"].command("install", none, ["/x.rpm"]) == ["dnf", "install", "-y", "/x.rpm"]
+
+
+def test_dnf_options(dnf_links_to):
+    dnf_links_to("dnf-3")
+    profile = {"max_parallel_downloads": 10, "deltarpm": False, "fastestmirror": True, "keepcache": True}
+    assert DnfBackend().options(profile) == [
+        "--setopt=max_parallel_downloads=10",
+        "--setopt=deltarpm=False",
+        "--setopt=fastestmirror=True",
+        "--setopt=keepcache=True",
+    ]
+
+
+def test_int_tunable_zero_is_skipped(dnf_links_to):
+    dnf_links_to("dnf-3")
+    assert DnfBackend().options({"max_parallel_downloads": 0, "keepcache": False}) == ["--setopt=keepcache=False"]
+
+
+def test_deltarpm_dropped_for_dnf5():
+    profile = {"max_parallel_downloads": 4, "deltarpm": True}
+    assert "deltarpm" not in [key for key, _, _ in Dnf5Backend.TUNABLES]
+    assert Dnf5Backend().options(profile) == ["--setopt=max_parallel_downloads=4"]
+
+
+def test_deltarpm_dropped_when_dnf_is_dnf5(dnf_links_to):
+    dnf_links_to("dnf5")
+    assert dnf_is_dnf5()
+    assert DnfBackend().command("install", {"deltarpm": True}, ["/x.rpm"]) == ["dnf", "install", "-y", "/x.rpm"]
+
+    dnf_links_to("dnf-3")
+    assert not dnf_is_dnf5()
+    assert DnfBackend().options({"deltarpm": True}) == ["--setopt=deltarpm=True"]
+
+
+def test_zypper_download_mode():
+    zypper = ZypperBackend()
+    assert zypper.command("install", {"download_in_advance": True}, ["/x.rpm"]) == [
+        "zypper", "--non-interactive", "install", "--download-in-advance", "/x.rpm"]
+    assert zypper.command("update", {"download_in_advance": False}) == [
+        "zypper", "--non-interactive", "update", "--download-as-needed"]
+
+
+def test_zypper_parallel_downloads_env_prefix():
+    zypper = ZypperBackend()
+    assert zypper.command("update", {"parallel_downloads": True}) == [
+        "env", "ZYPP_CURL2=1", "ZYPP_PCK_PRELOAD=1", "zypper", "--non-interactive", "update"]
+    assert zypper.command("update", {"parallel_downloads": False})[:2] == ["env", "ZYPP_PCK_PRELOAD=0"]
+
+
+def test_automatic_selection_skips_dnf5():
+    assert [key for key, b in BACKENDS.items() if b.auto] == ["dnf", "zypper", "yum", "rpm"]
+
+
+def test_update_action_and_refresh():
+    assert [BACKENDS[k].update_action for k in ("dnf", "dnf5", "zypper", "yum")] == [
+        "upgrade", "upgrade", "update", "update"]
+    assert BACKENDS["zypper"].refresh_cmd() == ["zypper", "refresh"]
+    assert BACKENDS["dnf"].refresh_cmd() is None
+    assert BACKENDS["rpm"].update_action is None
@@ -0,0 +1,294 @@
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from grsms_download import RangedDownloader, local_name, rpm_header_size, rpm_payload_digest
+
+
+def header(entries, store):
+    """Header bytes for [(tag, type, offset)] entries over data store."""
+    index = b"".join(struct.pack(">IIII", tag, kind, off, 1) for tag, kind, off in entries)
+    return b"\x8e\xad\xe8\x01" + b"\0" * 4 + struct.pack(">II", len(entries), len(store)) + index + store
+
+
+def make_digested_rpm(payload):
+    """A package carrying a header SHA256 and a SHA256 payload digest."""
+    digest = hashlib.sha256(payload).hexdigest().encode() + b"\0"
+    store = digest + b"\0" * ((4 - len(digest) % 4) % 4)
+    hdr = header([(5092, 8, 0), (5093, 4, len(store))], store + struct.pack(">I", 8))
+    sig = header([(273, 6, 0)], hashlib.sha256(hdr).hexdigest().encode() + b"\0")
+    lead = b"\xed\xab\xee\xdb" + b"\0" * 92
+    pad = b"\0" * ((8 - (len(lead) + len(sig)) % 8) % 8)
+    return lead + sig + pad + hdr + payload
+
+
+def make_rpm(payload_size):
+    lead = b"\xed\xab\xee\xdb" + b"\0" * 92
+    sig = b"\x8e\xad\xe8\x01" + b"\0" * 4 + struct.pack(">II", 2, 13) + b"\0" * (2 * 16 + 13)
+    pad = b"\0" * ((8 - (len(lead) + len(sig)) % 8) % 8)
+    hdr = b"\x8e\xad\xe8\x01" + b"\0" * 4 + struct.pack(">II", 50, 70000) + b"\0" * (50 * 16 + 70000)
+    head = lead + sig + pad + hdr
+    return head + os.urandom(payload_size), len(head)
+
+
+DATA, HEADER_END = make_rpm(3 * 1024 * 1024 + 123)
+
+
+class Handler(BaseHTTPRequestHandler):
+    data = DATA
+    ranged = True
+    etag = '"v1"'
+    last_modified = None
+    drop_after = None      # close the first range starting past this offset
+    served = 0
+    redirects = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        if self.path.startswith("/redirect/"):
+            cls.redirects += 1
+            self.send_response(302)
+            self.send_header("Location", self.path[len("/redirect"):])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        # If-Range only matches a strong ETag or the exact Last-Modified
+        if_range = self.headers.get("If-Range")
+        strong = [v for v in (cls.etag, cls.last_modified) if v and not v.startswith("W/")]
+        if if_range is not None and if_range not in strong:
+            match = None
+        if match and cls.ranged:
+            start, end = int(match.group(1)), int(match.group(2))
+            body = cls.data[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(cls.data)}")
+        else:
+            start, body = 0, cls.data
+            self.send_response(200)
+        if cls.etag:
+            self.send_header("ETag", cls.etag)
+        if cls.last_modified:
+            self.send_header("Last-Modified", cls.last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if cls.drop_after is not None and match and start > cls.drop_after:
+            cls.drop_after = None
+            self.wfile.write(body[:1000])
+            cls.served += 1000
+            return
+        self.wfile.write(body)
+        cls.served += len(body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    handler = type("TestHandler", (Handler,), {})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    # The fake package has no valid digests, so skip rpm -K
+    monkeypatch.setattr(RangedDownloader, "_verify", lambda self: None)
+    monkeypatch.setattr(RangedDownloader, "RETRY_DELAY", 0)
+    yield handler, f"http://127.0.0.1:{srv.server_address[1]}/pkg-1.0.rpm"
+    srv.shutdown()
+    srv.server_close()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def interrupt_halfway(url, tmp_path):
+    d = RangedDownloader(url, 4, download_dir=str(tmp_path))
+    d.progress = lambda done, total: d.stop() if done > len(DATA) // 2 else None
+    with pytest.raises(InterruptedError):
+        d.run()
+    return d
+
+
+def test_rpm_header_size():
+    assert rpm_header_size(DATA[:10]) == (96, False)
+    assert rpm_header_size(DATA) == (HEADER_END, True)
+    with pytest.raises(ValueError):
+        rpm_header_size(b"x" * 200)
+
+
+def test_ranged_download(server, tmp_path):
+    handler, url = server
+    headers = []
+    d = RangedDownloader(url, 4, header_ready=headers.append, download_dir=str(tmp_path))
+    path = d.run()
+    assert read(path) == DATA
+    assert headers == [d.part_path]
+    assert not os.path.exists(d.part_path)
+    assert not os.path.exists(d.state_path)
+
+
+def test_server_without_ranges(server, tmp_path):
+    handler, url = server
+    handler.ranged = False
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+    assert any("single connection" in line for line in logs)
+
+
+def test_dropped_connection_is_retried(server, tmp_path):
+    handler, url = server
+    handler.drop_after = 1024 * 1024
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+    assert any("retrying" in line for line in logs)
+
+
+def test_resume_from_state(server, tmp_path):
+    handler, url = server
+    d = interrupt_halfway(url, tmp_path)
+    assert os.path.exists(d.state_path)
+
+    handler.served = 0
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+    assert any("Resuming" in line for line in logs)
+    assert handler.served < len(DATA) // 2 + 1024 * 1024
+
+
+def test_no_resume_without_validator(server, tmp_path):
+    handler, url = server
+    handler.etag = None
+    interrupt_halfway(url, tmp_path)
+
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+    assert not any("Resuming" in line for line in logs)
+
+
+def test_failed_verification_discards_download(server, tmp_path, monkeypatch):
+    handler, url = server
+
+    def bad_digest(self):
+        raise ValueError("digest verification failed")
+
+    monkeypatch.setattr(RangedDownloader, "_verify", bad_digest)
+    d = RangedDownloader(url, 4, download_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        d.run()
+    assert not os.path.exists(d.part_path)
+    assert not os.path.exists(d.state_path)
+
+
+def test_local_name():
+    assert local_name("http://host/pkgs/foo-1.0.x86_64.rpm") == "foo-1.0.x86_64.rpm"
+    assert local_name("http://host/my%20pkg.rpm") == "my pkg.rpm"
+    assert local_name("http://host/dl.php?id=1") == "dl.php.rpm"
+    for url in ("http://host/a/%2E%2E", "http://host/a/.", "http://host/"):
+        name = local_name(url)
+        assert name not in ("..", ".") and name.endswith(".rpm") and len(name) > 4
+
+
+def test_same_name_from_different_urls(tmp_path):
+    a = RangedDownloader("http://host/dl.php?id=1", download_dir=str(tmp_path))
+    b = RangedDownloader("http://host/dl.php?id=2", download_dir=str(tmp_path))
+    assert a.dest != b.dest
+    assert os.path.dirname(os.path.dirname(a.dest)) == str(tmp_path)
+
+
+def test_stop_interrupts_retry_delay(server, tmp_path, monkeypatch):
+    handler, url = server
+    handler.drop_after = 1024 * 1024
+    monkeypatch.setattr(RangedDownloader, "RETRY_DELAY", 60)
+    d = RangedDownloader(url, 4, download_dir=str(tmp_path))
+    d.log = lambda text: d.stop() if "retrying" in text else None
+    started = time.monotonic()
+    with pytest.raises(InterruptedError):
+        d.run()
+    assert time.monotonic() - started < 10
+
+
+def test_weak_etag_is_not_used_as_validator(server, tmp_path):
+    handler, url = server
+    handler.etag = 'W/"v1"'
+    path = RangedDownloader(url, 4, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+
+    # Last-Modified still allows resuming
+    os.remove(path)
+    handler.last_modified = "Mon, 23 Feb 2026 10:00:00 GMT"
+    interrupt_halfway(url, tmp_path)
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == DATA
+    assert any("Resuming" in line for line in logs)
+
+
+def test_redirect_is_followed_once(server, tmp_path):
+    handler, url = server
+    mirror_url = url.replace("/pkg-1.0.rpm", "/redirect/pkg-1.0.rpm")
+    d = RangedDownloader(mirror_url, 4, download_dir=str(tmp_path))
+    assert read(d.run()) == DATA
+    assert handler.redirects == 1
+    assert d.fetch_url == url
+
+
+@pytest.mark.parametrize("ranged", [True, False])
+def test_digests_checked_as_data_arrives(server, tmp_path, monkeypatch, ranged):
+    handler, url = server
+    handler.data = make_digested_rpm(os.urandom(3 * 1024 * 1024))
+    handler.ranged = ranged
+
+    def no_rpm_k(self):
+        raise AssertionError("rpm -K should not be needed")
+
+    monkeypatch.setattr(RangedDownloader, "_verify", no_rpm_k)
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == handler.data
+    assert any("digests verified" in line for line in logs)
+
+
+@pytest.mark.parametrize("ranged", [True, False])
+def test_corrupt_payload_is_rejected(server, tmp_path, ranged):
+    handler, url = server
+    good = make_digested_rpm(os.urandom(3 * 1024 * 1024))
+    handler.data = good[:-10] + bytes(b ^ 0xff for b in good[-10:])
+    handler.ranged = ranged
+    d = RangedDownloader(url, 4, download_dir=str(tmp_path))
+    with pytest.raises(ValueError, match="payload digest"):
+        d.run()
+    assert not os.path.exists(d.part_path)
+    assert not os.path.exists(d.state_path)
+
+
+def test_corrupt_header_is_rejected():
+    data = bytearray(make_digested_rpm(b"payload"))
+    data[-20] ^= 0xff    # inside the main header's data store
+    with pytest.raises(ValueError, match="header digest"):
+        rpm_payload_digest(bytes(data[:-len(b"payload")]))
+    assert rpm_payload_digest(DATA[:HEADER_END]) is None
+
+
+def test_digest_checked_after_resume(server, tmp_path):
+    handler, url = server
+    handler.data = make_digested_rpm(os.urandom(3 * 1024 * 1024))
+    d = RangedDownloader(url, 4, download_dir=str(tmp_path))
+    d.progress = lambda done, total: d.stop() if done > len(handler.data) // 2 else None
+    with pytest.raises(InterruptedError):
+        d.run()
+    logs = []
+    path = RangedDownloader(url, 4, log=logs.append, download_dir=str(tmp_path)).run()
+    assert read(path) == handler.data
+    assert any("Resuming" in line for line in logs)
+    assert any("digests verified" in line for line in logs)